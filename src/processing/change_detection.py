@@ -8,7 +8,13 @@ Includes various filters to reduce SAR speckle and noise
 import rasterio
 import numpy as np
 import argparse
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 from pathlib import Path
+from rasterio.enums import Resampling
+from rasterio.windows import Window
 from scipy import ndimage
 from scipy.ndimage import median_filter, gaussian_filter, binary_opening, binary_closing
 from skimage.filters import rank
@@ -16,6 +22,240 @@ from skimage.morphology import disk, square
 import warnings
 warnings.filterwarnings('ignore')
 
+try:
+    from numba import get_num_threads, njit, prange, set_num_threads, threading_layer
+    HAS_NUMBA = True
+except ImportError:
+    # Numba is an optional accelerator; without it the scipy/numpy paths are used
+    HAS_NUMBA = False
+    prange = range
+
+    def njit(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda func: func
+
+# The kernels below are deliberately not cached on disk (cache=True): this file
+# runs both as processing.change_detection and as a script, and Numba's cache
+# entries recorded under one module name fail to load under the other.
+
+# Kernel sizes from which the Huang histogram median beats scipy's selection median
+HUANG_MIN_SIZE = 5
+
+# Percentiles bounding the 256 quantization levels of the Huang median
+QUANTIZE_PERCENTILES = (0.5, 99.5)
+
+# Internal tile size of the rasters written by the pipeline; also the unit of
+# windowed processing
+BLOCK_SIZE = 512
+
+# Decimation factors of the internal overviews added to written rasters
+OVERVIEW_FACTORS = (2, 4, 8, 16)
+
+# GDAL settings for raster I/O: multi-threaded (de)compression and a larger block cache
+GDAL_ENV = {
+    'GDAL_NUM_THREADS': 'ALL_CPUS',
+    'GDAL_CACHEMAX': 512,
+    'CPL_VSIL_CURL_ALLOWED_EXTENSIONS': '.tif,.tiff',
+    'VSI_CACHE': True,
+}
+
+# Upper bound on tiles processed concurrently. The Numba kernels are already
+# parallel, so the pool mainly overlaps I/O and scipy's single-threaded
+# filters; the cores are split between pool threads and Numba threads.
+TILE_WORKERS = 4
+
+# Tiles the 'prefetch' I/O backend reads ahead of the computation
+PREFETCH_DEPTH = 32
+
+
+@njit(parallel=True, nogil=True, boundscheck=False)
+def _huang_median_u8(padded, size, out):
+    """
+    Huang sliding-histogram median over a pre-padded uint8 image
+
+    Each output row keeps its own 256-bin histogram and slides it along the
+    columns, so the per-pixel cost is O(size) instead of O(size^2 log size).
+    Rows are independent and split across threads with prange.
+    """
+    rows, cols = out.shape
+    rank = (size * size) // 2  # same rank scipy's median_filter selects
+    for i in prange(rows):
+        hist = np.zeros(256, dtype=np.int32)
+        for r in range(i, i + size):
+            for c in range(size):
+                hist[padded[r, c]] += 1
+
+        # med is the median bin; below counts the values that fall under it
+        med = 0
+        below = 0
+        while below + hist[med] <= rank:
+            below += hist[med]
+            med += 1
+        out[i, 0] = med
+
+        for j in range(1, cols):
+            for r in range(i, i + size):
+                v = padded[r, j - 1]
+                hist[v] -= 1
+                if v < med:
+                    below -= 1
+                v = padded[r, j + size - 1]
+                hist[v] += 1
+                if v < med:
+                    below += 1
+            while below > rank:
+                med -= 1
+                below -= hist[med]
+            while below + hist[med] <= rank:
+                below += hist[med]
+                med += 1
+            out[i, j] = med
+
+
+def fast_median_filter(data, size=3):
+    """
+    Median filter that dispatches to the Numba Huang kernel for large windows
+    
+    The data is quantized to 256 levels over a robust range (the
+    QUANTIZE_PERCENTILES of the tile, widened to include 0), filtered, and
+    scaled back to float32. Values outside the range are clipped, which the
+    median tolerates, so a few epsilon-clamped outliers do not coarsen the
+    steps. Exact zeros get a level of their own and are restored exactly, so
+    nodata stays 0. Small kernels, non-2D input or a missing Numba install fall
+    back to scipy's exact median_filter.
+    
+    Args:
+        data: Input 2D array
+        size: Median window size
+    """
+    if not HAS_NUMBA or size < HUANG_MIN_SIZE or data.ndim != 2:
+        return median_filter(data, size=size)
+    
+    lo, hi = np.percentile(data, QUANTIZE_PERCENTILES)
+    lo = min(float(lo), 0.0)
+    hi = max(float(hi), 0.0)
+    if hi <= lo:
+        return data.astype(np.float32)
+    
+    # Shift the range so that 0 lands exactly on a level with at least one
+    # level on either side, and reserve that level for exact zeros. The
+    # mapping stays monotonic, so out == zero_level exactly where the true
+    # median is 0.
+    scale = 255.0 / (hi - lo)
+    zero_level = min(max(round(-lo * scale), 1), 254)
+    lo = -zero_level / scale
+    quantized = np.rint((np.clip(data, lo, lo + 255.0 / scale) - lo) * scale).astype(np.uint8)
+    near_zero = (quantized == zero_level) & (data != 0)
+    quantized[near_zero] = np.where(data[near_zero] > 0, zero_level + 1, zero_level - 1)
+    
+    # Mirror scipy's window placement and 'reflect' boundary mode
+    before = size // 2
+    after = size - 1 - before
+    padded = np.pad(quantized, ((before, after), (before, after)), mode='symmetric')
+    
+    out = np.empty(data.shape, dtype=np.uint8)
+    _huang_median_u8(padded, size, out)
+    result = out.astype(np.float32) * np.float32(1.0 / scale) + np.float32(lo)
+    result[out == zero_level] = 0
+    return result
+
+
+# Only the fastmath flags that keep the isfinite guard intact ('nnan', 'ninf'
+# and 'reassoc'+'nsz' together let LLVM fold it to True)
+@njit(parallel=True, nogil=True, fastmath={'arcp', 'contract', 'afn'})
+def _logratio(b1, b3, out, eps, nodata):
+    """Fused 10*log10(b3) - 10*log10(b1) with epsilon clamping, one pass per row"""
+    rows, cols = out.shape
+    for i in prange(rows):
+        for j in range(cols):
+            x1 = b1[i, j]
+            x3 = b3[i, j]
+            if x1 == nodata or x3 == nodata:
+                out[i, j] = 0.0
+                continue
+            if x1 <= 0:
+                x1 = eps
+            if x3 <= 0:
+                x3 = eps
+            r = np.float32(10.0) * (np.log10(x3) - np.log10(x1))
+            out[i, j] = r if np.isfinite(r) else 0.0
+
+
+def log_ratio(band_1_data, band_3_data, epsilon=1e-10, nodata=None):
+    """
+    Calculate 10*log10(band_3) - 10*log10(band_1) as float32
+    
+    Non-positive inputs are clamped to epsilon; pixels that are nodata in
+    either band and non-finite results are set to 0. Uses the fused Numba
+    kernel when available, plain numpy otherwise.
+    
+    Args:
+        band_1_data: First (pre-event) band
+        band_3_data: Third (post-event) band
+        epsilon: Floor applied to non-positive backscatter values
+        nodata: Nodata value of the bands, or None
+    """
+    band_1_data = np.ascontiguousarray(band_1_data, dtype=np.float32)
+    band_3_data = np.ascontiguousarray(band_3_data, dtype=np.float32)
+    epsilon = np.float32(epsilon)
+    # NaN never compares equal, so it disables the nodata check
+    nodata = np.float32(np.nan if nodata is None else nodata)
+    
+    if HAS_NUMBA and band_1_data.ndim == 2:
+        change = np.empty(band_1_data.shape, dtype=np.float32)
+        _logratio(band_1_data, band_3_data, change, epsilon, nodata)
+        return change
+    
+    invalid = (band_1_data == nodata) | (band_3_data == nodata)
+    band_1_data = np.where(band_1_data <= 0, epsilon, band_1_data)
+    band_3_data = np.where(band_3_data <= 0, epsilon, band_3_data)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        change = 10 * np.log10(band_3_data) - 10 * np.log10(band_1_data)
+    change[invalid | ~np.isfinite(change)] = 0
+    return change
+
+@njit(parallel=True, nogil=True)
+def _abs_threshold_kernel(data, threshold, mask):
+    """mask = |data| > threshold, one pass per row"""
+    rows, cols = data.shape
+    for i in prange(rows):
+        for j in range(cols):
+            mask[i, j] = abs(data[i, j]) > threshold
+
+
+@njit(parallel=True, nogil=True)
+def _zero_outside_kernel(data, mask):
+    """data[~mask] = 0 in place, one pass per row"""
+    rows, cols = data.shape
+    for i in prange(rows):
+        for j in range(cols):
+            if not mask[i, j]:
+                data[i, j] = 0
+
+
+def abs_threshold_mask(data, threshold):
+    """
+    Boolean mask of |data| > threshold
+    
+    Computed in a single pass without the float temporary of np.abs when
+    Numba is available.
+    """
+    if HAS_NUMBA and data.ndim == 2:
+        mask = np.empty(data.shape, dtype=np.bool_)
+        _abs_threshold_kernel(data, threshold, mask)
+        return mask
+    return np.abs(data) > threshold
+
+
+def zero_outside_mask(data, mask):
+    """Set data to 0 wherever mask is False, in place, and return it"""
+    if HAS_NUMBA and data.ndim == 2:
+        _zero_outside_kernel(data, mask)
+    else:
+        np.copyto(data, 0, where=~mask)
+    return data
+
 def apply_filters(data, filter_type='median', **kwargs):
     """
     Apply various filters to reduce SAR speckle and noise
@@ -29,7 +269,7 @@ def apply_filters(data, filter_type='median', **kwargs):
     if filter_type == 'median':
         # Median filter - excellent for SAR speckle
         size = kwargs.get('size', 3)
-        return median_filter(data, size=size)
+        return fast_median_filter(data, size=size)
     
     elif filter_type == 'gaussian':
         # Gaussian smoothing
@@ -42,7 +282,7 @@ def apply_filters(data, filter_type='median', **kwargs):
         structure_size = kwargs.get('structure_size', 3)
         
         # Create binary mask
-        binary_mask = np.abs(data) > threshold
+        binary_mask = abs_threshold_mask(data, threshold)
         
         # Apply opening (erosion followed by dilation) to remove small spots
         if structure_size > 0:
@@ -50,8 +290,8 @@ def apply_filters(data, filter_type='median', **kwargs):
             binary_mask = binary_opening(binary_mask, structure=structure)
             binary_mask = binary_closing(binary_mask, structure=structure)
         
-        # Apply mask to original data
-        return np.where(binary_mask, data, 0)
+        # Apply mask to (a copy of) the original data
+        return zero_outside_mask(data.copy(), binary_mask)
     
     elif filter_type == 'minimum_mapping_unit':
         # Remove patches smaller than minimum mapping unit
@@ -59,18 +299,20 @@ def apply_filters(data, filter_type='median', **kwargs):
         min_pixels = kwargs.get('min_pixels', 9)  # 3x3 pixels minimum
         
         # Create binary mask
-        binary_mask = np.abs(data) > threshold
-        
-        # Label connected components
-        labeled, num_features = ndimage.label(binary_mask)
+        binary_mask = abs_threshold_mask(data, threshold)
         
-        # Remove small components
-        for i in range(1, num_features + 1):
-            component_mask = labeled == i
-            if np.sum(component_mask) < min_pixels:
-                binary_mask[component_mask] = False
+        # Label connected components (int32 labels are plenty for one scene)
+        labeled, num_features = ndimage.label(binary_mask, output=np.int32)
         
-        return np.where(binary_mask, data, 0)
+        # Remove small components: count pixels per label in one pass and
+        # map the keep/drop lookup table back onto the label image
+        counts = np.bincount(labeled.ravel(), minlength=num_features + 1)
+        keep = counts >= min_pixels
+        keep[0] = False  # background
+        binary_mask = keep[labeled]
+
+        # Apply mask to (a copy of) the original data
+        return zero_outside_mask(data.copy(), binary_mask)
     
     elif filter_type == 'bilateral':
         # Bilateral filter (edge-preserving smoothing)
@@ -79,11 +321,11 @@ def apply_filters(data, filter_type='median', **kwargs):
         return gaussian_filter(data, sigma=sigma)
     
     elif filter_type == 'combined':
-        # Apply multiple filters in sequence
-        filtered = data.copy()
+        # Apply multiple filters in sequence; every step returns a new array
+        # (or works on our own one), so the input needs no defensive copy
         
         # 1. Median filter for speckle
-        filtered = median_filter(filtered, size=kwargs.get('median_size', 3))
+        filtered = fast_median_filter(data, size=kwargs.get('median_size', 3))
         
         # 2. Light gaussian smoothing
         filtered = gaussian_filter(filtered, sigma=kwargs.get('gaussian_sigma', 0.8))
@@ -92,23 +334,277 @@ def apply_filters(data, filter_type='median', **kwargs):
         threshold = kwargs.get('threshold', 0.3)
         structure_size = kwargs.get('structure_size', 2)
         
-        binary_mask = np.abs(filtered) > threshold
+        binary_mask = abs_threshold_mask(filtered, threshold)
         if structure_size > 0:
             structure = np.ones((structure_size, structure_size))
             binary_mask = binary_opening(binary_mask, structure=structure)
         
-        filtered = np.where(binary_mask, filtered, 0)
-        
-        return filtered
+        # filtered is our own gaussian output, so it can be masked in place
+        return zero_outside_mask(filtered, binary_mask)
     
     else:
         return data
 
+def filter_halo(filter_type='median', **kwargs):
+    """
+    Number of context pixels a filter needs on each side of a window
+    
+    Returns None for filters that are not local (connected-component
+    filtering), which then have to run on the whole scene at once.
+    
+    Args:
+        filter_type: Type of filter to apply
+        **kwargs: Filter-specific parameters, as passed to apply_filters
+    """
+    if filter_type == 'median':
+        return kwargs.get('size', 3) // 2
+    elif filter_type in ('gaussian', 'bilateral'):
+        # scipy truncates the gaussian kernel at 4 sigma
+        return int(4.0 * kwargs.get('sigma', 1.0) + 0.5)
+    elif filter_type == 'morphological':
+        # opening + closing: two erosions and two dilations
+        return 2 * kwargs.get('structure_size', 3)
+    elif filter_type == 'combined':
+        return (kwargs.get('median_size', 3) // 2
+                + int(4.0 * kwargs.get('gaussian_sigma', 0.8) + 0.5)
+                + kwargs.get('structure_size', 2))
+    elif filter_type == 'minimum_mapping_unit':
+        return None
+    else:
+        return 0
+
+def tiled_profile(profile, dtype):
+    """
+    Copy of a rasterio profile for a single-band, tiled and compressed output
+    
+    Together with build_overviews this gives cloud-optimized style GeoTIFFs
+    that later steps (and remote readers) can access window by window.
+    
+    Args:
+        profile: Source profile
+        dtype: Output data type
+    """
+    profile = profile.copy()
+    profile.update({
+        'count': 1,
+        'dtype': dtype,
+        'nodata': 0,
+        'tiled': True,
+        'blockxsize': BLOCK_SIZE,
+        'blockysize': BLOCK_SIZE,
+        'compress': 'deflate',
+        # horizontal differencing for integers, floating point predictor otherwise
+        'predictor': 3 if np.dtype(dtype).kind == 'f' else 2,
+        'num_threads': 'ALL_CPUS',
+    })
+    return profile
+
+def build_overviews(dst, resampling=Resampling.average):
+    """
+    Add internal overviews to a dataset opened for writing
+    
+    Only levels that are still larger than a single tile are built.
+    
+    Args:
+        dst: Dataset opened in 'w' or 'r+' mode, with all data written
+        resampling: Overview resampling method
+    """
+    size = max(dst.width, dst.height)
+    factors = [f for f in OVERVIEW_FACTORS if size > BLOCK_SIZE * f // 2]
+    if factors:
+        dst.build_overviews(factors, resampling)
+        dst.update_tags(ns='rio_overview', resampling=resampling.name)
+
+def _pad_window(window, halo, height, width):
+    """Grow a window by halo pixels (clipped to the raster) and locate the original inside it"""
+    row0 = max(window.row_off - halo, 0)
+    col0 = max(window.col_off - halo, 0)
+    row1 = min(window.row_off + window.height + halo, height)
+    col1 = min(window.col_off + window.width + halo, width)
+    
+    padded = Window(col0, row0, col1 - col0, row1 - row0)
+    inner = (slice(window.row_off - row0, window.row_off - row0 + window.height),
+             slice(window.col_off - col0, window.col_off - col0 + window.width))
+    return padded, inner
+
+def _max_workers():
+    """Number of threads processing tiles concurrently"""
+    if HAS_NUMBA:
+        # Run a parallel kernel once so Numba selects its threading layer; the
+        # fallback 'workqueue' layer must not be entered from several threads
+        log_ratio(np.ones((1, 1), np.float32), np.ones((1, 1), np.float32))
+        if threading_layer() == 'workqueue':
+            return 1
+    return max(1, min(TILE_WORKERS, os.cpu_count() or 1))
+
+def _run_tile(numba_threads, process_window, *args):
+    """Run process_window on a pool thread, limited to its share of Numba threads"""
+    if HAS_NUMBA:
+        # Thread-local: without it every pool thread would start a Numba team
+        # as wide as the machine (workers x cores threads under 'omp')
+        set_num_threads(numba_threads)
+    return process_window(*args)
+
+def _read_bands(src, band1, band3, window):
+    """Read a window of both bands as float32 (nodata is handled by log_ratio)"""
+    band_1_data = src.read(band1, window=window, out_dtype=np.float32)
+    band_3_data = src.read(band3, window=window, out_dtype=np.float32)
+    return band_1_data, band_3_data
+
+def _put_until_stopped(tile_queue, item, stop):
+    """Put item on the bounded queue, giving up once the consumer sets stop"""
+    while not stop.is_set():
+        try:
+            tile_queue.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            pass
+    return False
+
+def _read_tiles(input_path, band1, band3, tiles, tile_queue, stop):
+    """Reader thread of the 'prefetch' backend: read tiles ahead into a bounded queue"""
+    try:
+        # Own dataset handle, handles must not be shared between threads
+        with rasterio.Env(**GDAL_ENV), rasterio.open(input_path) as src:
+            for window, padded, inner in tiles:
+                band_1_data, band_3_data = _read_bands(src, band1, band3, padded)
+                if not _put_until_stopped(tile_queue, (window, inner, band_1_data, band_3_data), stop):
+                    return
+        _put_until_stopped(tile_queue, None, stop)
+    except Exception as exc:
+        _put_until_stopped(tile_queue, exc, stop)
+
+def _iter_tiles(src, band1, band3, windows, halo, io_backend='sync'):
+    """
+    Yield (window, inner, band_1_data, band_3_data) for each output window
+    
+    The 'sync' backend reads each padded tile when it is needed; 'prefetch'
+    reads up to PREFETCH_DEPTH tiles ahead on a separate thread so disk
+    access overlaps with the filtering.
+    """
+    tiles = [(window, *_pad_window(window, halo, src.height, src.width)) for window in windows]
+    
+    if io_backend == 'prefetch':
+        tile_queue = queue.Queue(maxsize=PREFETCH_DEPTH)
+        # Set when the consumer stops early (error or generator closed) so the
+        # reader does not block forever on a full queue
+        stop = threading.Event()
+        reader = threading.Thread(target=_read_tiles, daemon=True,
+                                  args=(src.name, band1, band3, tiles, tile_queue, stop))
+        reader.start()
+        try:
+            while (item := tile_queue.get()) is not None:
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            stop.set()
+            reader.join()
+        return
+    
+    for window, padded, inner in tiles:
+        band_1_data, band_3_data = _read_bands(src, band1, band3, padded)
+        yield window, inner, band_1_data, band_3_data
+
+def _process_window(band_1_data, band_3_data, inner, nodata, filter_type, filter_params):
+    """Log-ratio and filter one padded tile, returning its float32 interior"""
+    # Calculate change detection: 10*log10(band_3) - 10*log10(band_1)
+    # (non-positive values clamped to epsilon, nodata and invalid results set to 0)
+    change = log_ratio(band_1_data, band_3_data, epsilon=1e-10, nodata=nodata)
+    
+    # Apply filtering
+    if filter_type != 'none':
+        change = apply_filters(change, filter_type, **filter_params)
+    
+    return change[inner].astype(np.float32, copy=False)
+
+def _process_window_gpu(band_1_data, band_3_data, inner, nodata, filter_type, filter_params):
+    """
+    CuPy variant of _process_window
+    
+    The log-ratio runs on the GPU, and so does the filter when it is 'median'
+    (exact, no quantization). Any other filter, including 'combined', is
+    applied on the host to the full padded tile before cropping. Each
+    call uses its own CUDA stream so that tiles from different worker
+    threads overlap their transfers and kernels.
+    """
+    import cupy as cp
+    from cupyx.scipy.ndimage import median_filter as gpu_median_filter
+    
+    epsilon = np.float32(1e-10)
+    with cp.cuda.Stream(non_blocking=True) as stream:
+        b1 = cp.asarray(band_1_data, dtype=cp.float32)
+        b3 = cp.asarray(band_3_data, dtype=cp.float32)
+        
+        change = (10 * cp.log10(cp.where(b3 <= 0, epsilon, b3))
+                  - 10 * cp.log10(cp.where(b1 <= 0, epsilon, b1)))
+        invalid = ~cp.isfinite(change)
+        if nodata is not None:
+            invalid |= (b1 == nodata) | (b3 == nodata)
+        change[invalid] = 0
+        
+        if filter_type == 'median':
+            change = gpu_median_filter(change, size=filter_params.get('size', 3))
+        
+        change = cp.asnumpy(change, stream=stream)  # blocks until copied
+    
+    # Host filters need the halo too, so crop only afterwards
+    if filter_type not in ('none', 'median'):
+        change = apply_filters(change, filter_type, **filter_params)
+    
+    return change[inner].astype(np.float32, copy=False)
+
+@njit(nogil=True)
+def _stats_kernel(change):
+    """count/min/max/sum/sum of squares of the finite, non-zero pixels in one pass"""
+    count = 0
+    vmin = np.inf
+    vmax = -np.inf
+    total = 0.0
+    sumsq = 0.0
+    rows, cols = change.shape
+    for i in range(rows):
+        for j in range(cols):
+            x = change[i, j]
+            if x != 0 and np.isfinite(x):
+                y = float(x)  # accumulate in float64
+                count += 1
+                vmin = min(vmin, y)
+                vmax = max(vmax, y)
+                total += y
+                sumsq += y * y
+    return count, vmin, vmax, total, sumsq
+
+def _update_stats(stats, change):
+    """Accumulate count/min/max/sum/sum of squares of the valid (finite, non-zero) pixels"""
+    if HAS_NUMBA and change.ndim == 2:
+        count, vmin, vmax, total, sumsq = _stats_kernel(change)
+    else:
+        valid = change[np.isfinite(change) & (change != 0)]
+        count = valid.size
+        if count:
+            vmin, vmax = valid.min(), valid.max()
+            total = valid.sum(dtype=np.float64)
+            sumsq = np.square(valid, dtype=np.float64).sum()
+    
+    if count:
+        stats['count'] += int(count)
+        stats['min'] = min(stats['min'], float(vmin))
+        stats['max'] = max(stats['max'], float(vmax))
+        stats['sum'] += float(total)
+        stats['sumsq'] += float(sumsq)
+
 def calculate_change_detection(input_path, output_path, band1=1, band3=3, 
-                             filter_type='median', filter_params=None):
+                             filter_type='median', filter_params=None, io_backend='sync',
+                             gpu=False):
     """
     Calculate change detection with filtering for SAR data
     
+    The scene is streamed through in output tiles: each tile is read with
+    enough surrounding context for the filter, processed and written, so
+    memory stays bounded by the tile size. Non-local filters
+    (minimum_mapping_unit) are run on the whole scene in one go.
+    
     Args:
         input_path: Path to input multiband raster
         output_path: Path to output change detection raster
@@ -116,59 +612,85 @@ def calculate_change_detection(input_path, output_path, band1=1, band3=3,
         band3: Band number for third band (default: 3)
         filter_type: Type of filter to apply
         filter_params: Dictionary of filter parameters
+        io_backend: 'sync' to read tiles on demand, 'prefetch' to read ahead
+            on a background thread
+        gpu: Run the log-ratio, and the filter when it is 'median', on the GPU
+            (requires CuPy)
     """
     
     if filter_params is None:
         filter_params = {}
     
-    with rasterio.open(input_path) as src:
-        # Read the bands
-        print(f"📖 Reading band {band1} and band {band3} from {input_path}")
-        band_1_data = src.read(band1, masked=True)
-        band_3_data = src.read(band3, masked=True)
-        
-        # Get the profile for output file
-        profile = src.profile.copy()
-        
-    # Ensure we have positive values for log calculation
-    epsilon = 1e-10
-    band_1_data = np.where(band_1_data <= 0, epsilon, band_1_data)
-    band_3_data = np.where(band_3_data <= 0, epsilon, band_3_data)
-    
-    # Calculate change detection: 10*log10(band_3) - 10*log10(band_1)
-    print("🧮 Calculating change detection...")
-    with np.errstate(invalid='ignore', divide='ignore'):
-        change = 10 * np.log10(band_3_data) - 10 * np.log10(band_1_data)
-    
-    # Handle any remaining invalid values
-    change = np.where(np.isfinite(change), change, 0)
-    
-    # Apply filtering
-    if filter_type != 'none':
-        print(f"🔧 Applying {filter_type} filter...")
-        change = apply_filters(change, filter_type, **filter_params)
+    if gpu:
+        try:
+            import cupy  # noqa: F401
+        except ImportError as e:
+            raise ImportError("GPU processing requires CuPy (e.g. `conda install cupy`)") from e
+        process_window = _process_window_gpu
+    else:
+        process_window = _process_window
     
-    # Update profile for single band output
-    profile.update({
-        'count': 1,
-        'dtype': 'float32',
-        'nodata': 0
-    })
+    halo = filter_halo(filter_type, **filter_params)
+    stats = {'count': 0, 'min': np.inf, 'max': -np.inf, 'sum': 0.0, 'sumsq': 0.0}
     
-    # Write the result
-    print(f"💾 Writing result to {output_path}")
-    with rasterio.open(output_path, 'w', **profile) as dst:
-        dst.write(change.astype('float32'), 1)
+    with rasterio.Env(**GDAL_ENV), rasterio.open(input_path) as src:
+        profile = tiled_profile(src.profile, 'float32')
+        
+        print(f"📖 Reading band {band1} and band {band3} from {input_path}")
+        print("🧮 Calculating change detection...")
+        if filter_type != 'none':
+            print(f"🔧 Applying {filter_type} filter...")
+        print(f"💾 Writing result to {output_path}")
+        
+        with rasterio.open(output_path, 'w', **profile) as dst:
+            if halo is None:
+                # Filter needs the whole scene (connected components)
+                windows = [Window(0, 0, src.width, src.height)]
+                halo = 0
+            else:
+                windows = [window for _, window in dst.block_windows(1)]
+            
+            # Datasets are not thread-safe: read and write on this thread and
+            # only hand the computation to the pool, keeping a bounded number
+            # of tiles in flight
+            workers = _max_workers()
+            total_threads = get_num_threads() if HAS_NUMBA else (os.cpu_count() or 1)
+            numba_threads = max(1, total_threads // workers)
+            pending = {}
+            
+            def write_done(futures):
+                for future in futures:
+                    change = future.result()
+                    dst.write(change, 1, window=pending.pop(future))
+                    _update_stats(stats, change)
+            
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                tiles = _iter_tiles(src, band1, band3, windows, halo, io_backend)
+                for window, inner, band_1_data, band_3_data in tiles:
+                    future = executor.submit(_run_tile, numba_threads, process_window,
+                                             band_1_data, band_3_data, inner, src.nodata,
+                                             filter_type, filter_params)
+                    pending[future] = window
+                    
+                    if len(pending) >= 2 * workers:
+                        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                        write_done(done)
+                
+                done, _ = wait(pending)
+                write_done(done)
+            
+            build_overviews(dst, Resampling.average)
     
     # Print some statistics
-    valid_pixels = np.isfinite(change) & (change != 0)
-    if np.any(valid_pixels):
+    if stats['count']:
+        mean = stats['sum'] / stats['count']
+        std = np.sqrt(max(stats['sumsq'] / stats['count'] - mean * mean, 0.0))
         print(f"📊 Change detection statistics:")
-        print(f"   Min: {np.min(change[valid_pixels]):.3f}")
-        print(f"   Max: {np.max(change[valid_pixels]):.3f}")
-        print(f"   Mean: {np.mean(change[valid_pixels]):.3f}")
-        print(f"   Std: {np.std(change[valid_pixels]):.3f}")
-        print(f"   Valid pixels: {np.sum(valid_pixels):,}")
+        print(f"   Min: {stats['min']:.3f}")
+        print(f"   Max: {stats['max']:.3f}")
+        print(f"   Mean: {mean:.3f}")
+        print(f"   Std: {std:.3f}")
+        print(f"   Valid pixels: {stats['count']:,}")
     
     print("✅ Change detection completed!")
 
@@ -191,6 +713,11 @@ def main():
     parser.add_argument('--structure-size', type=int, default=3, help='Morphological structure size')
     parser.add_argument('--min-pixels', type=int, default=9, help='Minimum pixels for mapping unit filter')
     
+    # I/O options
+    parser.add_argument('--io-backend', choices=['sync', 'prefetch'], default='sync',
+                       help='Tile reading: on demand or read ahead on a background thread (default: sync)')
+    parser.add_argument('--gpu', action='store_true', help="Run the log-ratio, and the filter when it is 'median', on the GPU (requires CuPy)")
+    
     args = parser.parse_args()
     
     # Validate input file exists
@@ -212,7 +739,7 @@ def main():
     }
     
     calculate_change_detection(args.input, args.output, args.band1, args.band3, 
-                             args.filter, filter_params)
+                             args.filter, filter_params, args.io_backend, args.gpu)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
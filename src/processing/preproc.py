@@ -3,9 +3,11 @@
 
 from pathlib import Path
 import argparse
+import os
 import subprocess
 import sys
 import shutil
+import tempfile
 # --- NEW: Import geopandas to handle vector data ---
 import geopandas as gpd
 
@@ -14,6 +16,30 @@ REPO_ROOT = Path(__file__).resolve().parents[2]
 GRAPH = REPO_ROOT / "config" / "graphs" / "preproc_full.xml"
 GPT_EXECUTABLE = shutil.which("gpt") or "/opt/snap/bin/gpt"
 
+# ── AOI Helpers ───────────────────────────────────────────────────────────────
+
+def aoi_to_wkt(aoi_path: Path) -> str:
+    """
+    Dissolves all features of an AOI file into a single geometry and returns it as WKT.
+    The WKT is cached in a sibling '.wkt' file and reused while it is newer than the AOI.
+    """
+    aoi_path = Path(aoi_path)
+    cache = aoi_path.with_suffix(".wkt")
+    if cache.exists() and cache.stat().st_mtime >= aoi_path.stat().st_mtime:
+        return cache.read_text()
+
+    aoi_wkt = gpd.read_file(aoi_path).geometry.union_all().wkt
+
+    # Write atomically so a concurrent run never reads a half-written cache
+    try:
+        fd, tmp_name = tempfile.mkstemp(dir=cache.parent, prefix=f".{cache.name}.", suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            f.write(aoi_wkt)
+        os.replace(tmp_name, cache)
+    except OSError:
+        pass  # read-only location: the cache is only an optimisation
+    return aoi_wkt
+
 # ── GPT Wrapper ───────────────────────────────────────────────────────────────
 
 # --- MODIFIED: Function now accepts a WKT string for the AOI ---
@@ -70,11 +96,8 @@ def main() -> None:
         if not aoi_file.exists():
             sys.exit(f"❌ AOI file not found: {aoi_file}")
         print(f"i Reading AOI from: {aoi_file}")
-        # Read the file and dissolve all features into a single geometry
-        gdf = gpd.read_file(aoi_file)
-        unified_geometry = gdf.unary_union
-        # Convert the unified geometry to a WKT string
-        aoi_wkt_string = unified_geometry.wkt
+        # Dissolve all features into a single geometry as a WKT string
+        aoi_wkt_string = aoi_to_wkt(aoi_file)
         
     for f in (master_file, slave_file):
         if not f.exists():
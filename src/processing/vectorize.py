@@ -3,6 +3,7 @@
 from __future__ import annotations
 
 import argparse
+import importlib.util
 import logging
 import sys
 from dataclasses import dataclass
@@ -15,7 +16,26 @@ import rasterio
 from rasterio.features import shapes
 from shapely.geometry import shape, Polygon
 from shapely.validation import make_valid
-from skimage.morphology import closing, opening, square
+
+try:
+    import pyogrio
+except ImportError:  # optional: fall back to GeoPandas' default (Fiona) writer
+    pyogrio = None
+
+
+def _arrow_supported() -> bool:
+    """Whether pyogrio can write through Arrow (needs pyarrow, pyogrio >= 0.8, GDAL >= 3.8)."""
+    if pyogrio is None or importlib.util.find_spec("pyarrow") is None:
+        return False
+    try:
+        pyogrio_version = tuple(int(part) for part in pyogrio.__version__.split(".")[:2])
+    except ValueError:
+        return False
+    return pyogrio_version >= (0, 8) and tuple(pyogrio.__gdal_version__) >= (3, 8, 0)
+
+
+# Arrow lets pyogrio hand whole columns to GDAL instead of feature by feature
+_USE_ARROW = _arrow_supported()
 
 logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
 _LOG = logging.getLogger(__name__)
@@ -36,33 +56,51 @@ class Config:
 
 def _load_mask(path: Path):
     with rasterio.open(path) as src:
-        return src.read(1, out_dtype=np.uint8), src.transform, src.crs
+        mask = np.ascontiguousarray(src.read(1, out_dtype=np.uint8))
+        return mask, src.transform, src.crs
 
 
 def _write_gdf(gdf: gpd.GeoDataFrame, out_: Path) -> None:
     out_.parent.mkdir(parents=True, exist_ok=True)
-    gdf.to_file(out_, driver="GeoJSON")
+    if pyogrio is not None:
+        pyogrio.write_dataframe(gdf, out_, driver="GeoJSON", use_arrow=_USE_ARROW)
+    else:
+        gdf.to_file(out_, driver="GeoJSON")
 
 
 # ────────────────────── geometry generation ─────────────────────
 
+def _grow(mask: np.ndarray, op) -> np.ndarray:
+    """3×3 binary erosion (op=np.logical_and) or dilation (op=np.logical_or).
+
+    Separable: combine each pixel with its row neighbours, then with its column
+    neighbours. Pixels outside the image are ignored, which for a 3×3 window is
+    the same as skimage's default 'reflect' border.
+    """
+    out = mask.copy()
+    op(out[1:], mask[:-1], out=out[1:])
+    op(out[:-1], mask[1:], out=out[:-1])
+    rows = out.copy()
+    op(out[:, 1:], rows[:, :-1], out=out[:, 1:])
+    op(out[:, :-1], rows[:, 1:], out=out[:, :-1])
+    return out
+
+
 def _clean(mask: np.ndarray) -> np.ndarray:
-    """Performs morphological opening and closing to clean the mask."""
-    k = square(3)
-    return closing(opening(mask, k), k)
+    """Performs morphological opening and closing (3×3 square) to clean the {0, 1} mask."""
+    m = mask.view(bool)
+    m = _grow(_grow(m, np.logical_and), np.logical_or)  # opening
+    m = _grow(_grow(m, np.logical_or), np.logical_and)  # closing
+    return m.view(np.uint8)
 
 
 def _iter_polys(mask: np.ndarray, transform) -> Iterable[Polygon]:
     """Iterates over shapes in the raster and yields valid polygons."""
-    for geom, val in shapes(mask, mask=mask == 1, transform=transform):
-        if val:
-            poly = shape(geom)
-            yield poly if poly.is_valid else make_valid(poly)
-
-
-def _ha(poly: Polygon) -> float:
-    """Calculates the area of a polygon in hectares."""
-    return poly.area / 10_000.0
+    # The mask is {0, 1} uint8, so it can be reinterpreted as bool without a copy.
+    # Only burn pixels are polygonized; 8-connectivity matches the sieve step.
+    for geom, _ in shapes(mask, mask=mask.view(bool), transform=transform, connectivity=8):
+        poly = shape(geom)
+        yield poly if poly.is_valid else make_valid(poly)
 
 
 # ─────────────────────────── engine ─────────────────────────────
@@ -73,23 +111,23 @@ def vectorize(cfg: Config) -> None:
     if cfg.clean:
         mask = _clean(mask)
 
-    # Check for a completely empty mask first.
-    if not (mask == 1).any():
+    # Check for a completely empty mask first (a single reduction, no temporary).
+    if mask.max() == 0:
         _LOG.warning("no burn pixels — writing empty layer")
         _write_gdf(gpd.GeoDataFrame(columns=["geometry", "area_ha"], crs=crs), cfg.out_geojson)
         return
 
     # --- MODIFIED ---
     # Generate ALL polygons without any size filtering.
-    feats = [
-        {"geometry": p, "area_ha": _ha(p)}
-        for p in _iter_polys(mask, transform)
-    ]
+    polys = gpd.GeoSeries(list(_iter_polys(mask, transform)), crs=crs)
+
+    # Areas in hectares, computed for all polygons in one vectorized call.
+    gdf = gpd.GeoDataFrame({"area_ha": polys.area.to_numpy() / 10_000.0}, geometry=polys, crs=crs)
 
     # --- MODIFIED ---
     # Unconditionally write whatever was found.
-    _LOG.info("Found %d polygons. Writing to file...", len(feats))
-    _write_gdf(gpd.GeoDataFrame(feats, crs=crs), cfg.out_geojson)
+    _LOG.info("Found %d polygons. Writing to file...", len(gdf))
+    _write_gdf(gdf, cfg.out_geojson)
 
 
 # ─────────────────────────── CLI ────────────────────────────────
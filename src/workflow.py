@@ -14,13 +14,14 @@ from pathlib import Path
 import shutil
 import time
 
-import geopandas as gpd
+import numpy as np
 import rasterio
+from rasterio.enums import Resampling
 from rasterio.features import sieve
 
 try:
-    from processing.preproc import run_gpt_graph
-    from processing.change_detection import calculate_change_detection
+    from processing.preproc import aoi_to_wkt, run_gpt_graph
+    from processing.change_detection import GDAL_ENV, build_overviews, calculate_change_detection, tiled_profile
     from processing.vectorize import vectorize, Config as VectorizeConfig
 except ImportError as e:
     print(
@@ -44,6 +45,8 @@ def parse_args() -> argparse.Namespace:
     parser.add_argument("--median-size", type=int, default=10, help="Size of the median filter kernel. Default is 10.")
     parser.add_argument("--threshold", type=float, default=3.0, help="Threshold value to create the binary mask. Default is 3.0.")
     parser.add_argument("--sieve-size", type=int, default=500, help="Minimum size in pixels for a burn scar to be kept after sieving. Default is 500.")
+    parser.add_argument("--io-backend", choices=["sync", "prefetch"], default="sync", help="How change detection reads tiles: on demand, or read ahead on a background thread. Default is sync.")
+    parser.add_argument("--gpu", action="store_true", help="Run the log-ratio and median filter on the GPU (requires CuPy).")
     
     # --- REMOVED --min-area-ha argument ---
     
@@ -61,25 +64,22 @@ def format_duration(seconds: float) -> str:
     return f"{int(minutes)}m {seconds:.1f}s"
 
 
-def threshold_raster(input_path: Path, output_path: Path, threshold: float) -> None:
-    print(f"▶ 3. Thresholding raster at a value of {threshold}...")
-    with rasterio.open(input_path) as src:
-        profile = src.profile.copy()
-        image = src.read(1)
-        mask = (image >= threshold).astype(rasterio.uint8)
-        profile.update(dtype=rasterio.uint8, count=1, nodata=0)
-        with rasterio.open(output_path, 'w', **profile) as dst:
-            dst.write(mask, 1)
-
-
-def sieve_raster(input_path: Path, output_path: Path, size: int) -> None:
-    print(f"▶ 4. Sieving mask to remove pixel clusters smaller than {size} pixels...")
-    with rasterio.open(input_path) as src:
-        profile = src.profile.copy()
-        mask = src.read(1)
-        sieve(mask, size=size, out=mask, connectivity=8)
+def threshold_and_sieve(input_path: Path, output_path: Path, threshold: float, sieve_size: int) -> None:
+    print(f"▶ 3. Thresholding raster at a value of {threshold} and sieving clusters smaller than {sieve_size} pixels...")
+    with rasterio.Env(**GDAL_ENV), rasterio.open(input_path) as src:
+        profile = tiled_profile(src.profile, rasterio.uint8)
+        # Threshold block by block into one in-memory uint8 mask; sieving works
+        # on connected components, so it needs the whole mask at once
+        mask = np.empty((src.height, src.width), dtype=rasterio.uint8)
+        for _, window in src.block_windows(1):
+            image = src.read(1, window=window)
+            rows, cols = window.toslices()
+            np.greater_equal(image, threshold, out=mask[rows, cols].view(bool))
+        sieve(mask, size=sieve_size, out=mask, connectivity=8)
         with rasterio.open(output_path, 'w', **profile) as dst:
             dst.write(mask, 1)
+            # Nearest keeps the overviews of the binary mask binary
+            build_overviews(dst, Resampling.nearest)
 
 
 def main() -> None:
@@ -107,15 +107,13 @@ def main() -> None:
     try:
         stacked_tif = process_dir / "1_stack_gamma0.tif"
         change_tif = process_dir / "2_change_detection.tif"
-        threshold_mask_tif = process_dir / "3_change_mask.tif"
-        final_mask_tif = process_dir / "4_burn_mask.tif"
+        final_mask_tif = process_dir / "3_burn_mask.tif"
         
         # --- Step 1 ---
         step_start_time = time.monotonic() if args.timer else None
         print("─" * 60)
         print("▶ 1. Pre-processing and stacking master/slave images...")
-        aoi_gdf = gpd.read_file(aoi_path)
-        aoi_wkt = aoi_gdf.unary_union.wkt
+        aoi_wkt = aoi_to_wkt(aoi_path)
         run_gpt_graph(master_zip, slave_zip, stacked_tif, aoi_wkt)
         duration_str = f" (took {format_duration(time.monotonic() - step_start_time)})" if args.timer else ""
         print(f"✓ Stack saved to: {stacked_tif.name}{duration_str}")
@@ -128,7 +126,9 @@ def main() -> None:
             input_path=stacked_tif,
             output_path=change_tif,
             filter_type='median',
-            filter_params={'size': args.median_size}
+            filter_params={'size': args.median_size},
+            io_backend=args.io_backend,
+            gpu=args.gpu
         )
         duration_str = f" (took {format_duration(time.monotonic() - step_start_time)})" if args.timer else ""
         print(f"✓ Change map saved to: {change_tif.name}{duration_str}")
@@ -136,21 +136,14 @@ def main() -> None:
         # --- Step 3 ---
         step_start_time = time.monotonic() if args.timer else None
         print("─" * 60)
-        threshold_raster(change_tif, threshold_mask_tif, args.threshold)
-        duration_str = f" (took {format_duration(time.monotonic() - step_start_time)})" if args.timer else ""
-        print(f"✓ Threshold mask saved to: {threshold_mask_tif.name}{duration_str}")
-
-        # --- Step 4 ---
-        step_start_time = time.monotonic() if args.timer else None
-        print("─" * 60)
-        sieve_raster(threshold_mask_tif, final_mask_tif, args.sieve_size)
+        threshold_and_sieve(change_tif, final_mask_tif, args.threshold, args.sieve_size)
         duration_str = f" (took {format_duration(time.monotonic() - step_start_time)})" if args.timer else ""
         print(f"✓ Final sieved mask saved to: {final_mask_tif.name}{duration_str}")
         
-        # --- Step 5 ---
+        # --- Step 4 ---
         step_start_time = time.monotonic() if args.timer else None
         print("─" * 60)
-        print(f"▶ 5. Polygonizing final mask to GeoJSON...")
+        print(f"▶ 4. Polygonizing final mask to GeoJSON...")
         
         # --- MODIFIED: Removed min_area_ha from the call ---
         vectorize_cfg = VectorizeConfig(